@@ -0,0 +1,26 @@
+# cython: language_level=3
+"""排课冲突约束矩阵组装（Cython预编译版）
+
+编译：python setup.py build_ext --inplace
+编译后排课.py会优先使用本模块，未编译时回退到Numba/numpy实现。
+"""
+cimport cython
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def fill_conflict_coo(int n_times, int[::1] memb_ids, int[::1] memb_offsets,
+                      int[::1] rows, int[::1] cols, signed char[::1] data):
+    """按 分组→组内课程→时段 顺序填充冲突约束的COO三元组（结果与Numba版一致）"""
+    cdef Py_ssize_t n_groups = memb_offsets.shape[0] - 1
+    cdef Py_ssize_t g, k, t, pos
+    cdef int col0
+    with nogil:
+        for g in range(n_groups):
+            for k in range(memb_offsets[g], memb_offsets[g + 1]):
+                col0 = memb_ids[k] * n_times
+                pos = k * n_times
+                for t in range(n_times):
+                    rows[pos + t] = <int>(g * n_times + t)
+                    cols[pos + t] = <int>(col0 + t)
+                    data[pos + t] = 1
@@ -0,0 +1,9 @@
+# 编译可选的Cython扩展：python setup.py build_ext --inplace
+from Cython.Build import cythonize
+from setuptools import setup
+
+setup(
+    name="scheduler_ext",
+    ext_modules=cythonize("scheduler_ext.pyx"),
+    zip_safe=False,
+)
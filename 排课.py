@@ -1,44 +1,137 @@
+import argparse
+import functools
+import importlib.util
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
-from pulp import LpProblem, LpVariable, LpMinimize, lpSum, LpInteger, LpStatus
+from pulp import LpProblem, LpVariable, LpMinimize, LpInteger, LpStatus
+from pulp import LpAffineExpression, LpConstraint, LpConstraintEQ, LpConstraintLE
+from pulp import GUROBI_CMD, HiGHS_CMD, PULP_CBC_CMD
+
+try:  # 可选：C++实现的建模层（pip install pyoptinterface highspy），建模速度远快于PuLP
+    import pyoptinterface as poi
+    from pyoptinterface import highs as poi_highs
+except ImportError:
+    poi = None
+
+try:  # 可选：直接把模型写成稀疏矩阵交给scipy自带的HiGHS（scipy>=1.9）
+    from scipy import sparse
+    from scipy.optimize import Bounds, LinearConstraint, milp
+except ImportError:
+    milp = None
+
+try:  # 可选：预编译的Cython扩展（python setup.py build_ext --inplace），没有JIT预热开销
+    from scheduler_ext import fill_conflict_coo
+except ImportError:
+    fill_conflict_coo = None
+
+try:  # 可选：用Numba把冲突矩阵组装循环编译成机器码（按分组多线程并行）
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # ====================== 第一步：配置基础参数（核心扩展） ======================
 # 1. Excel文件路径（无需修改）
 EXCEL_PATH = r"C:\Users\86185\Desktop\25-26（1）课程情况.xlsx"
+# Excel解析较慢：首次读取后在Excel旁边缓存一份“<Excel文件名>.cache.parquet”，Excel未更新时直接读缓存（需安装pyarrow）
 # 2. 学时换算：每时段2学时（保持兼容）
 HOUR_PER_SLOT = 2
 # 3. 时间配置：扩展到16周（可用时段=16*5*6=480）
 week_range = range(1, 17)  # 16周（学期常规时长）
 day_range = range(1, 6)  # 周一到周五
 slot_range = range(1, 7)  # 每天6个时段
-TIMES = [f"Time_{w}_{d}_{s}" for w in week_range for d in day_range for s in slot_range]
+N_TIMES = len(week_range) * len(day_range) * len(slot_range)  # 可用时段总数（480），导入时算一次
+TIMES_IDX = range(N_TIMES)  # 时段用整数序号，导出时才转成名称
 # 4. 约束开关（核心：先关教师约束，找到可行解后再开启）
 ENABLE_TEACHER_CONSTRAINT = False  # 先关闭教师约束
 ENABLE_CLASS_CONSTRAINT = True  # 保留核心的班级约束
 ENABLE_ROOM_CONSTRAINT = False  # 继续关闭场地约束
+# 5. 求解器配置（PuLP建模时）："auto" = 按 Gurobi → HiGHS → CBC 顺序选择第一个可用的；也可指定"gurobi"/"highs"/"cbc"
+SOLVER_NAME = "auto"
+SOLVER_TIME_LIMIT = 600  # 求解时间上限（秒），避免卡死
+SOLVER_THREADS = os.cpu_count() or 1
+# 6. 建模方式（依赖未安装时自动回退到PuLP）：
+#    "sparse" = scipy稀疏矩阵+HiGHS（最快）；"poi" = PyOptInterface+HiGHS；"pulp" = PuLP（支持Gurobi/CBC）
+MODEL_BACKEND = "sparse"
+# 7. 冲突约束按需添加（仅PuLP）：先只带学时约束求解，再补充被违反的冲突约束并热启动重解
+#    默认关闭：冲突约束多数会起作用时，反复重解反而比一次性加入慢得多；所有轮次共用SOLVER_TIME_LIMIT
+LAZY_CONFLICT_CONSTRAINTS = False
+LAZY_MAX_ROUNDS = 10  # 超过轮数仍有冲突时，一次性补齐全部冲突约束再做最后一次求解
+# 8. 贪心预排：先按班级（及开启的教师/场地）占用情况贪心排课，排满则跳过MIP，否则作为PuLP的初始解
+GREEDY_PRESOLVE = True
+# 9. 按周聚合（默认关闭，仅用PuLP求解）：先只求每门课每周排几次，再贪心展开到具体(天, 节)；
+#    每周上限只是松弛条件，展开经常失败，失败时仍回到完整的 课程×480时段 模型
+WEEKLY_AGGREGATE = False
+
+
+@dataclass(slots=True)
+class Course:
+    """单门课程的排课信息"""
+    name: str
+    teacher: str
+    classes: list
+    room: str
+    total_hour: int
+    required_slots: int
+    type: str
+
+
+@functools.cache
+def time_names():
+    """时段序号→“Time_周_天_节”名称（仅在导出时生成一次）"""
+    return np.array(
+        [f"Time_{w}_{d}_{s}" for w in week_range for d in day_range for s in slot_range], dtype=object
+    )
 
 
 # ====================== 第二步：查看Excel真实列名 ======================
+def load_course_table(path):
+    """读取课程表；按文件修改时间缓存，Excel未改动时重复调用不再解析"""
+    return read_course_table(path, os.path.getmtime(path))
+
+
+@functools.lru_cache(maxsize=4)
+def read_course_table(path, mtime):
+    """列名去空格；优先使用比Excel新的parquet缓存（mtime为Excel修改时间，同时作为缓存键）
+    缓存文件名由Excel文件名派生，同一目录下的多个Excel互不干扰"""
+    cache_path = f"{path}.cache.parquet"
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= mtime:
+        print(f"📦 使用缓存：{cache_path}（删除该文件可强制重新读取Excel）")
+        return pd.read_parquet(cache_path)
+
+    df = pd.read_excel(path)
+    df.columns = df.columns.str.strip()
+    try:
+        df.to_parquet(cache_path, index=False)
+        print(f"📦 已缓存Excel数据：{cache_path}")
+    except (ImportError, ValueError, TypeError, OSError):
+        pass  # 没有parquet引擎或列类型不兼容时不缓存，不影响排课
+    return df
+
+
 def check_excel_columns():
-    """打印Excel所有列名"""
+    """打印Excel所有列名，返回读取到的表格（读取失败返回None）"""
     try:
-        df = pd.read_excel(EXCEL_PATH)
-        df.columns = df.columns.str.strip()
+        df = load_course_table(EXCEL_PATH)
         print("=" * 50)
         print("你的Excel表格真实列名：")
         for idx, col in enumerate(df.columns):
             print(f"{idx + 1}. {col}")
         print("=" * 50)
-        return df.columns.tolist()
+        return df
     except FileNotFoundError:
         print(f"错误：未找到文件 {EXCEL_PATH}")
-        return []
+        return None
 
 
 # ====================== 第三步：数据预处理（增加资源缺口分析） ======================
-def preprocess_data(real_columns):
-    """读取Excel+数据校验+资源缺口分析"""
-    df = pd.read_excel(EXCEL_PATH)
-    df.columns = df.columns.str.strip()
+def preprocess_data(df):
+    """数据校验+资源缺口分析（df为check_excel_columns读取到的表格，不会被修改）"""
+    real_columns = df.columns.tolist()
 
     # 匹配你的Excel真实列名
     core_cols = [
@@ -59,52 +152,44 @@ def preprocess_data(real_columns):
     df = df.dropna(subset=core_cols).reset_index(drop=True)
     df["课程ID"] = [f"C{i + 1}" for i in range(len(df))]
 
-    # 数据校验+整理
-    courses = {}
+    # 数据校验+整理（整列向量化处理，避免iterrows逐行装箱）
     print("\n📋 数据校验结果：")
-    total_required_slots = 0  # 所有课程总时段需求
-    for _, row in df.iterrows():
-        course_id = row["课程ID"]
-        course_name = row["课程名称"].strip()
-        total_hour = int(row["课程总学时"])
-
-        # 兼容学时不能整除：自动向上取整并提示
-        required_slots = total_hour // HOUR_PER_SLOT
-        if total_hour % HOUR_PER_SLOT != 0:
-            required_slots = total_hour // HOUR_PER_SLOT + 1
-            print(f"⚠️ 课程[{course_name}]总学时{total_hour}，调整为{required_slots}个时段")
-
-        total_required_slots += required_slots  # 累计总需求
-
-        # 拆分班级
-        class_str = str(row["教学班组成"]).strip()
-        if "、" in class_str:
-            classes = [cls.strip() for cls in class_str.split("、") if cls.strip()]
-        elif "," in class_str:
-            classes = [cls.strip() for cls in class_str.split(",") if cls.strip()]
-        else:
-            classes = [class_str]
-
-        courses[course_id] = {
-            "name": course_name,
-            "teacher": row["教师名称"].strip(),
-            "classes": classes,
-            "room": row["场地类别"].strip(),
-            "total_hour": total_hour,
-            "required_slots": required_slots,
-            "type": row["学时类型"].strip()
-        }
+    for col in ("课程名称", "教师名称", "场地类别", "学时类型"):
+        df[col] = df[col].astype(str).str.strip()
+    # 教师/场地/学时类型重复值多，转成category（按整数编码存储和分组）；课程名称基本不重复，保持原样
+    for col in ("教师名称", "场地类别", "学时类型"):
+        df[col] = df[col].astype("category")
+    df["total_hour"] = df["课程总学时"].astype("int32")
+
+    # 兼容学时不能整除：自动向上取整并提示（无分支的整数向上取整）
+    df["required_slots"] = (df["total_hour"] + (HOUR_PER_SLOT - 1)) // HOUR_PER_SLOT
+    adjusted = df[df["total_hour"] % HOUR_PER_SLOT != 0]
+    for name, total_hour, required_slots in zip(
+        adjusted["课程名称"], adjusted["total_hour"], adjusted["required_slots"]
+    ):
+        print(f"⚠️ 课程[{name}]总学时{total_hour}，调整为{required_slots}个时段")
+    total_required_slots = int(df["required_slots"].sum())  # 所有课程总时段需求
+
+    # 拆分班级（支持“、”和“,”分隔）
+    df["classes"] = (
+        df["教学班组成"].astype(str).str.strip()
+        .str.split(r"[、,]", regex=True)
+        .map(lambda parts: [cls.strip() for cls in parts if cls.strip()])
+    )
+
+    course_cols = ["课程ID", "课程名称", "教师名称", "classes", "场地类别", "total_hour", "required_slots", "学时类型"]
+    courses = {
+        cid: Course(name, teacher, classes, room, int(total_hour), int(required_slots), course_type)
+        for cid, name, teacher, classes, room, total_hour, required_slots, course_type
+        in df[course_cols].itertuples(index=False)
+    }
 
     # 资源缺口分析（核心！定位冲突）
-    total_available_slots = len(TIMES)
-    teachers = {}
-    classes_dict = {}
-    for cid, info in courses.items():
-        # 教师课时统计
-        teachers[info["teacher"]] = teachers.get(info["teacher"], 0) + info["required_slots"]
-        # 班级课时统计
-        for cls in info["classes"]:
-            classes_dict[cls] = classes_dict.get(cls, 0) + info["required_slots"]
+    total_available_slots = N_TIMES
+    # 教师课时统计
+    teachers = df.groupby("教师名称", observed=True)["required_slots"].sum().to_dict()
+    # 班级课时统计
+    classes_dict = df[["classes", "required_slots"]].explode("classes").groupby("classes")["required_slots"].sum().to_dict()
 
     # 打印详细资源分析
     print(f"\n📊 核心资源统计（16周，可用时段总数：{total_available_slots}）：")
@@ -130,134 +215,575 @@ def preprocess_data(real_columns):
 
 
 # ====================== 第四步：构建排课模型（简化约束） ======================
-def build_scheduling_model(courses):
-    """构建模型+可开关约束"""
-    prob = LpProblem("CourseScheduling", LpMinimize)
-
-    # 决策变量：x[课程ID, 时段] = 1表示排课
-    x = LpVariable.dicts(
-        "x",
-        [(cid, t) for cid in courses.keys() for t in TIMES],
-        cat=LpInteger,
-        lowBound=0,
-        upBound=1
-    )
-
-    # 目标函数（仅求可行解）
-    prob += 0, "Feasibility_Objective"
-
-    # 约束1：每门课的排课时段数=需要的时段数
+def conflict_keys(info):
+    """课程占用的资源（只含已开启的约束），同一资源同一时段只能上1门课"""
+    keys = []
+    if ENABLE_TEACHER_CONSTRAINT:
+        keys.append(("teacher", info.teacher))
+    if ENABLE_CLASS_CONSTRAINT:
+        keys.extend(("class", cls) for cls in info.classes)
+    if ENABLE_ROOM_CONSTRAINT:
+        keys.append(("room", info.room))
+    return keys
+
+
+@functools.cache
+def spread_order(n_weeks):
+    """贪心排课时各时段的优先顺序（n_weeks周内的时段序号）
+    同一(天, 节)先轮遍所有周，再换到下一天、下一节，使每门课均匀分布到各周各天，而不是挤在最前面"""
+    n_days, n_slots = len(day_range), len(slot_range)
+    w, d, s = np.meshgrid(np.arange(n_weeks), np.arange(n_days), np.arange(n_slots), indexing="ij")
+    t = (w * n_days + d) * n_slots + s
+    return t.transpose(2, 1, 0).ravel()  # 顺序：节 → 天 → 周（周变化最快）
+
+
+def greedy_pack(courses, need, n_weeks):
+    """贪心排课：按需要的时段数从多到少，把每门课按spread_order顺序排进它占用的资源都空闲的时段
+    need为 {课程ID: 需要的时段数}，返回 ({课程ID: 时段序号数组}, complete)，complete=False表示有课程没排满"""
+    order = spread_order(n_weeks)
+    key_index = {}
+    course_rows = {
+        cid: [key_index.setdefault(key, len(key_index)) for key in dict.fromkeys(conflict_keys(info))]
+        for cid, info in courses.items()
+    }
+    busy = np.zeros((len(key_index), len(order)), dtype=bool)  # busy[资源, 时段]
+
+    schedule = {}
+    complete = True
+    for cid in sorted(courses, key=lambda c: need[c], reverse=True):
+        rows = course_rows[cid]
+        free = ~busy[rows].any(axis=0)
+        slots = np.sort(order[free[order]][:need[cid]])
+        busy[np.ix_(rows, slots)] = True
+        schedule[cid] = slots
+        complete = complete and len(slots) == need[cid]
+    return {cid: schedule[cid] for cid in courses}, complete
+
+
+def greedy_schedule(courses):
+    """贪心预排：在全部16周时段上直接排课，返回 (schedule, complete)"""
+    return greedy_pack(courses, {cid: info.required_slots for cid, info in courses.items()}, len(week_range))
+
+
+def group_courses(courses, key_of):
+    """按教师/班级/场地一次性分组：{分组键: [课程ID,...]}
+    只保留≥2门课的分组（单门课的组在任何时段都不会冲突，无需约束）"""
+    groups = {}
     for cid, info in courses.items():
-        prob += lpSum(x[(cid, t)] for t in TIMES) == info["required_slots"], f"Hour_Constraint_{cid}"
+        for key in dict.fromkeys(key_of(info)):
+            groups.setdefault(key, []).append(cid)
+    return {key: cids for key, cids in groups.items() if len(cids) > 1}
 
+
+def enabled_conflict_groups(courses):
+    """按约束开关打印状态，返回已开启的教师/班级/场地分组列表（每项为group_courses的结果）"""
+    conflict_groups = []
     # 约束2：教师无冲突（可开关，当前关闭）
     if ENABLE_TEACHER_CONSTRAINT:
-        teachers = list(set([info["teacher"] for info in courses.values()]))
-        for teacher in teachers:
-            teacher_courses = [cid for cid, info in courses.items() if info["teacher"] == teacher]
-            for t in TIMES:
-                prob += lpSum(x[(cid, t)] for cid in teacher_courses) <= 1, f"Teacher_Conflict_{teacher}_{t}"
+        conflict_groups.append(group_courses(courses, lambda info: [info.teacher]))
         print("✅ 已开启：教师同一时段仅上1门课")
     else:
         print("⚠️ 已关闭：教师无冲突约束（先找可行解）")
 
     # 约束3：班级无冲突（核心，保留开启）
     if ENABLE_CLASS_CONSTRAINT:
-        all_classes = list(set([cls for info in courses.values() for cls in info["classes"]]))
-        for cls in all_classes:
-            class_courses = [cid for cid, info in courses.items() if cls in info["classes"]]
-            for t in TIMES:
-                prob += lpSum(x[(cid, t)] for cid in class_courses) <= 1, f"Class_Conflict_{cls}_{t}"
+        conflict_groups.append(group_courses(courses, lambda info: info.classes))
         print("✅ 已开启：班级同一时段仅上1门课")
     else:
         print("⚠️ 已关闭：班级无冲突约束")
 
     # 约束4：场地无冲突（继续关闭）
     if ENABLE_ROOM_CONSTRAINT:
-        rooms = list(set([info["room"] for info in courses.values()]))
-        for room in rooms:
-            room_courses = [cid for cid, info in courses.items() if info["room"] == room]
-            for t in TIMES:
-                prob += lpSum(x[(cid, t)] for cid in room_courses) <= 1, f"Room_Conflict_{room}_{t}"
+        conflict_groups.append(group_courses(courses, lambda info: [info.room]))
         print("✅ 已开启：场地无冲突约束")
     else:
         print("⚠️ 已关闭：场地无冲突约束")
+    return conflict_groups
+
+
+def course_rows(courses):
+    """课程ID → 行号（矩阵形式的模型里第几门课）"""
+    return {cid: i for i, cid in enumerate(courses)}
+
+
+def add_constraint(prob, pairs, sense, rhs):
+    """直接由(变量, 系数)列表构造约束，跳过lpSum逐项累加和 += 的解析
+    不传约束名：PuLP自动按序号命名（_C1, _C2...），避免拼接“班级+时段”长字符串写进模型文件"""
+    prob.addConstraint(LpConstraint(e=LpAffineExpression(pairs), sense=sense, rhs=rhs))
+
+
+def build_scheduling_model(courses):
+    """构建模型+可开关约束
+    返回 (prob, x, lazy_conflicts)，lazy_conflicts为尚未加入模型、求解时按需补充的冲突分组（课程ID列表）"""
+    prob = LpProblem("CourseScheduling", LpMinimize)
+    times = TIMES_IDX
+
+    # 决策变量：x[课程ID][时段序号] = 1表示排课（每门课一个列表，按序号直接索引）
+    # 直接用推导式批量创建（比LpVariable.dicts快），变量名用时段序号缩短LP文件
+    var = LpVariable
+    x = {cid: [var(f"x_{cid}_{t}", lowBound=0, upBound=1, cat=LpInteger) for t in times] for cid in courses}
+
+    # 只求可行解：不设目标函数（PuLP允许空目标）
+
+    lazy_conflicts = []
+
+    def add_conflicts(groups):
+        if LAZY_CONFLICT_CONSTRAINTS:
+            lazy_conflicts.extend(groups.values())
+            return
+        for cids in groups.values():
+            rows = [x[cid] for cid in cids]
+            for t in times:
+                add_constraint(prob, [(row[t], 1) for row in rows], LpConstraintLE, 1)
 
-    return prob, x
+    # 约束1：每门课的排课时段数=需要的时段数
+    for cid, info in courses.items():
+        add_constraint(prob, [(v, 1) for v in x[cid]], LpConstraintEQ, info.required_slots)
+
+    # 约束2~4：教师/班级/场地无冲突（按开关）
+    for groups in enabled_conflict_groups(courses):
+        add_conflicts(groups)
+
+    return prob, x, lazy_conflicts
+
+
+def build_poi_model(courses):
+    """用PyOptInterface构建同样的模型（变量为 课程×时段 矩阵）"""
+    model = poi_highs.Model()
+    model.set_model_attribute(poi.ModelAttribute.Silent, True)
+    model.set_raw_parameter("threads", SOLVER_THREADS)
+    model.set_raw_parameter("parallel", "on")
+    model.set_model_attribute(poi.ModelAttribute.TimeLimitSec, SOLVER_TIME_LIMIT)
+
+    # 决策变量：X[i, j] = 1表示第i门课排在第j个时段
+    cids = list(courses)
+    X = model.add_m_variables((len(cids), N_TIMES), domain=poi.VariableDomain.Binary)
+
+    # 约束1：每门课的排课时段数=需要的时段数
+    for i, cid in enumerate(cids):
+        model.add_linear_constraint(poi.quicksum(X[i, :]), poi.Eq, courses[cid].required_slots)
+
+    # 约束2~4：同一教师/班级/场地在同一时段最多1门课
+    row_of = course_rows(courses)
+    for groups in enabled_conflict_groups(courses):
+        for group in groups.values():
+            rows = [row_of[cid] for cid in group]
+            for j in TIMES_IDX:
+                model.add_linear_constraint(poi.quicksum(X[rows, j]), poi.Leq, 1)
+
+    return model, X
+
+
+if fill_conflict_coo is None and njit is not None:
+    @njit("void(int32, int32[:], int32[:], int32[:], int32[:], int8[:])", parallel=True, cache=True)
+    def fill_conflict_coo(n_times, memb_ids, memb_offsets, rows, cols, data):
+        """按 分组→组内课程→时段 顺序填充冲突约束的COO三元组
+        每个成员固定占n_times个位置，各分组写入的区间互不重叠，可按分组并行"""
+        for g in prange(len(memb_offsets) - 1):
+            for k in range(memb_offsets[g], memb_offsets[g + 1]):
+                col0 = memb_ids[k] * n_times
+                pos = k * n_times
+                for t in range(n_times):
+                    rows[pos + t] = g * n_times + t
+                    cols[pos + t] = col0 + t
+                    data[pos + t] = 1
+
+
+def build_conflict_coo(n_times, memb_ids, memb_offsets):
+    """由扁平化的分组成员（CSR格式：memb_ids + memb_offsets）生成冲突约束的(rows, cols, data)"""
+    nnz = len(memb_ids) * n_times
+    rows = np.empty(nnz, dtype=np.int32)
+    cols = np.empty(nnz, dtype=np.int32)
+    data = np.empty(nnz, dtype=np.int8)
+    if fill_conflict_coo is not None:
+        fill_conflict_coo(n_times, memb_ids, memb_offsets, rows, cols, data)
+    else:
+        # 未编译扩展也未安装numba：用numpy广播得到同样顺序的结果
+        group_of = np.repeat(np.arange(len(memb_offsets) - 1, dtype=np.int32), np.diff(memb_offsets))
+        t = np.arange(n_times, dtype=np.int32)
+        rows[:] = (group_of[:, None] * n_times + t).ravel()
+        cols[:] = (memb_ids[:, None] * n_times + t).ravel()
+        data[:] = 1
+    return rows, cols, data
+
+
+def build_sparse_model(courses):
+    """把模型直接写成稀疏矩阵：A_eq·x = b_eq（学时），A_ub·x ≤ 1（冲突）
+    变量编号：第i门课第j个时段 → i*时段数+j"""
+    cids = list(courses)
+    row_of = course_rows(courses)
+    n_courses, n_times = len(cids), N_TIMES
+    n_vars = n_courses * n_times
+
+    # 系数全为1：数据用int8、下标用int32存储，减少内存占用（交给求解器时由scipy统一转换一次）
+    # 约束1：第i行在第i门课的全部时段列上为1，右端为需要的时段数
+    A_eq = sparse.csr_matrix(
+        (
+            np.ones(n_vars, dtype=np.int8),
+            np.arange(n_vars, dtype=np.int32),
+            np.arange(0, n_vars + 1, n_times, dtype=np.int32),
+        ),
+        shape=(n_courses, n_vars),
+        dtype=np.int8,
+    )
+    b_eq = np.array([courses[cid].required_slots for cid in cids], dtype=np.int16)
+
+    # 约束2~4：每个(分组, 时段)一行，组内各课程该时段的变量为1
+    memb_ids, memb_offsets = [], [0]
+    for groups in enabled_conflict_groups(courses):
+        for members in groups.values():
+            memb_ids.extend(row_of[cid] for cid in members)
+            memb_offsets.append(len(memb_ids))
+    rows, cols, data = build_conflict_coo(
+        n_times, np.array(memb_ids, dtype=np.int32), np.array(memb_offsets, dtype=np.int32)
+    )
+    n_rows = (len(memb_offsets) - 1) * n_times
+    A_ub = sparse.csr_matrix((data, (rows, cols)), shape=(n_rows, n_vars), dtype=np.int8)
+
+    return A_eq, b_eq, A_ub
 
 
 # ====================== 第五步：求解并输出结果（修复Excel保存错误） ======================
-def solve_and_export(prob, x, courses):
-    """求解+输出详细结果"""
-    # 求解（增加时间限制，避免卡死）
-    prob.solve()
+def get_solver():
+    """按SOLVER_NAME返回求解器；"auto"时按 Gurobi → HiGHS → CBC 顺序返回第一个可用的"""
+    candidates = {
+        "gurobi": GUROBI_CMD(msg=False, timeLimit=SOLVER_TIME_LIMIT, threads=SOLVER_THREADS),
+        "highs": HiGHS_CMD(msg=False, timeLimit=SOLVER_TIME_LIMIT, threads=SOLVER_THREADS, options=["parallel=on"]),
+    }
+    names = list(candidates) if SOLVER_NAME == "auto" else [SOLVER_NAME]
+    for name in names:
+        solver = candidates.get(name)
+        if solver is not None and solver.available():
+            print(f"✅ 使用求解器：{solver.name}")
+            return solver
+    # CBC随PuLP自带，作为兜底
+    if SOLVER_NAME != "cbc":
+        print("⚠️ 未检测到指定的求解器，使用PuLP自带的CBC求解器")
+    return PULP_CBC_CMD(msg=False, timeLimit=SOLVER_TIME_LIMIT, threads=SOLVER_THREADS)
+
+
+def add_lazy_conflicts(prob, x, lazy_conflicts, added, only_violated=True):
+    """把冲突约束加入模型，返回新增条数
+    only_violated=True时只加当前解违反的约束；added记录已加入的(分组序号, 时段)，避免重复加入"""
+    count = 0
+    for gi, cids in enumerate(lazy_conflicts):
+        rows = [x[cid] for cid in cids]
+        for t in TIMES_IDX:
+            if (gi, t) in added:
+                continue
+            if only_violated and sum(row[t].varValue or 0 for row in rows) <= 1.5:
+                continue
+            add_constraint(prob, [(row[t], 1) for row in rows], LpConstraintLE, 1)
+            added.add((gi, t))
+            count += 1
+    return count
+
+
+def solve_and_export(prob, x, courses, lazy_conflicts=(), initial=None):
+    """求解+输出详细结果，initial为贪心预排结果（可不完整），用作热启动初始解"""
+    # 求解（增加时间限制，避免卡死；按需添加约束的所有轮次共用这一时间上限）
+    deadline = time.monotonic() + SOLVER_TIME_LIMIT
+    solver = get_solver()
+    if initial is not None:
+        for cid, row in x.items():
+            for v in row:
+                v.setInitialValue(0)
+            for t in initial[cid]:
+                row[t].setInitialValue(1)
+        solver.optionsDict["warmStart"] = True
+    prob.solve(solver)
+    # 按需补充冲突约束：每轮只加被违反的约束，直到解不再冲突
+    added = set()
+    rounds = 0
+    pending = bool(lazy_conflicts)
+    while prob.status == 1 and pending:
+        remaining = deadline - time.monotonic()
+        if rounds >= LAZY_MAX_ROUNDS or remaining <= 0:
+            break
+        count = add_lazy_conflicts(prob, x, lazy_conflicts, added)
+        if not count:
+            pending = False
+            break
+        rounds += 1
+        print(f"🔁 第{rounds}轮：补充{count}条被违反的冲突约束，重新求解")
+        solver.optionsDict["warmStart"] = True  # 以上一轮的解热启动
+        solver.timeLimit = remaining
+        prob.solve(solver)
+
+    # 轮数或时间用完仍可能有冲突：补齐全部冲突约束，用剩余时间做最后一次求解
+    if prob.status == 1 and pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print("⚠️ 已用完求解时间，当前解仍可能存在冲突")
+            print_infeasible_tips()
+            return
+        count = add_lazy_conflicts(prob, x, lazy_conflicts, added, only_violated=False)
+        print(f"⚠️ 已达到按需添加的轮数/时间上限，补齐剩余{count}条冲突约束后最后求解一次")
+        solver.timeLimit = remaining
+        prob.solve(solver)
     status = LpStatus[prob.status]
     print(f"\n📊 求解状态：{status}")
 
     if prob.status != 1:
-        print("⚠️ 仍无可行解！终极建议：")
-        print("  1. 临时关闭班级约束（ENABLE_CLASS_CONSTRAINT=False），确认基础可行性")
-        print("  2. 检查Excel中是否有“同一班级课时需求远超480”的异常数据")
-        print("  3. 核对“课程总学时”是否录入错误（如把16学时录成160）")
+        print_infeasible_tips()
+        return
+
+    schedule = {cid: [t for t in TIMES_IDX if x[cid][t].varValue == 1] for cid in courses}
+    export_results(courses, schedule)
+
+
+def solve_poi_and_export(model, X, courses):
+    """求解PyOptInterface模型+输出详细结果"""
+    print("✅ 使用求解器：HiGHS（PyOptInterface）")
+    model.optimize()
+    status = model.get_model_attribute(poi.ModelAttribute.TerminationStatus)
+    print(f"\n📊 求解状态：{status.name}")
+
+    if status != poi.TerminationStatusCode.OPTIMAL:
+        print_infeasible_tips()
         return
 
-    # 整理结果
+    schedule = {
+        cid: [t for t in TIMES_IDX if model.get_value(X[i, t]) > 0.5]
+        for i, cid in enumerate(courses)
+    }
+    export_results(courses, schedule)
+
+
+def solve_sparse_and_export(model, courses):
+    """用scipy.optimize.milp（HiGHS）求解稀疏矩阵模型+输出详细结果"""
+    A_eq, b_eq, A_ub = model
+    n_vars = A_eq.shape[1]
+    constraints = [LinearConstraint(A_eq, b_eq, b_eq)]
+    if A_ub.shape[0]:
+        constraints.append(LinearConstraint(A_ub, -np.inf, 1))
+
+    print("✅ 使用求解器：HiGHS（scipy.optimize.milp）")
+    res = milp(
+        c=np.zeros(n_vars),
+        constraints=constraints,
+        integrality=np.ones(n_vars, dtype=np.int8),
+        bounds=Bounds(0, 1),
+        options={"time_limit": SOLVER_TIME_LIMIT},
+    )
+    print(f"\n📊 求解状态：{res.message}")
+
+    if not res.success:
+        print_infeasible_tips()
+        return
+
+    X = res.x.reshape(len(courses), N_TIMES) > 0.5
+    schedule = {cid: np.flatnonzero(X[i]) for i, cid in enumerate(courses)}
+    export_results(courses, schedule)
+
+
+def solve_weekly_schedule(courses):
+    """按周聚合求解：y[课程ID][周] = 该课程本周排几个时段
+    约束：每门课各周合计=需要的时段数；同一资源每周合计≤peak≤每周时段数（5天×6节）
+    目标：最小化peak，让各周负载尽量均匀，便于展开
+    聚合解再逐周用greedy_pack展开到具体时段；无解或展开失败返回None"""
+    n_weeks = len(week_range)
+    week_slots = len(day_range) * len(slot_range)
+    prob = LpProblem("WeeklyScheduling", LpMinimize)
+    var = LpVariable
+    y = {
+        cid: [var(f"y_{cid}_{w}", lowBound=0, upBound=week_slots, cat=LpInteger) for w in range(n_weeks)]
+        for cid in courses
+    }
+    for cid, info in courses.items():
+        add_constraint(prob, [(v, 1) for v in y[cid]], LpConstraintEQ, info.required_slots)
+    peak = var("peak", lowBound=0, upBound=week_slots, cat=LpInteger)
+    prob.setObjective(LpAffineExpression([(peak, 1)]))
+    for cids in group_courses(courses, conflict_keys).values():
+        for w in range(n_weeks):
+            add_constraint(prob, [(y[cid][w], 1) for cid in cids] + [(peak, -1)], LpConstraintLE, 0)
+
+    prob.solve(get_solver())
+    print(f"\n📊 聚合模型求解状态：{LpStatus[prob.status]}")
+    if prob.status != 1:
+        return None
+
+    # 逐周展开：周内时段序号加上本周的起始序号
+    weekly = {cid: [round(v.varValue or 0) for v in row] for cid, row in y.items()}
+    parts = {cid: [] for cid in courses}
+    for w in range(n_weeks):
+        week_plan, complete = greedy_pack(courses, {cid: weekly[cid][w] for cid in courses}, 1)
+        if not complete:
+            print(f"⚠️ 第{w + 1}周的聚合解无法展开为具体时段")
+            return None
+        for cid, slots in week_plan.items():
+            parts[cid].append(slots + w * week_slots)
+    return {cid: np.concatenate(chunks) for cid, chunks in parts.items()}
+
+
+def print_infeasible_tips():
+    """无可行解时的排查建议"""
+    print("⚠️ 仍无可行解！终极建议：")
+    print("  1. 临时关闭班级约束（ENABLE_CLASS_CONSTRAINT=False），确认基础可行性")
+    print("  2. 检查Excel中是否有“同一班级课时需求远超480”的异常数据")
+    print("  3. 核对“课程总学时”是否录入错误（如把16学时录成160）")
+
+
+RESULT_COLUMNS = ["课程ID", "课程名称", "教师", "涉及班级", "场地类型", "总学时", "排课时段数", "排课时段"]
+
+
+def export_results(courses, schedule):
+    """保存Excel和TXT结果，schedule为 {课程ID: [时段序号,...]}"""
+    # 整理结果（时段序号在这里才转成名称）
+    names = time_names()
     result = []
     for cid, info in courses.items():
         course_result = {
             "课程ID": cid,
-            "课程名称": info["name"],
-            "教师": info["teacher"],
-            "涉及班级": "、".join(info["classes"]),
-            "场地类型": info["room"],
-            "总学时": info["total_hour"],
-            "排课时段数": info["required_slots"],
-            "排课时段": [t for t in TIMES if x[(cid, t)].varValue == 1]
+            "课程名称": info.name,
+            "教师": info.teacher,
+            "涉及班级": "、".join(info.classes),
+            "场地类型": info.room,
+            "总学时": info.total_hour,
+            "排课时段数": info.required_slots,
+            "排课时段": list(names[schedule[cid]])
         }
         result.append(course_result)
 
     # 保存Excel结果（修复：删除encoding参数）
-    result_df = pd.DataFrame(result)
-    result_df.to_excel("排课结果_16周.xlsx", index=False)  # 核心修复点：去掉encoding="utf-8"
+    # 时段列表先拼成字符串，单元格都是标量才能流式写入；装了xlsxwriter就用它（比openpyxl快）
+    result_df = pd.DataFrame(result, columns=RESULT_COLUMNS)  # 显式列名：没有课程时也能输出空表
+    result_df["排课时段"] = result_df["排课时段"].str.join("、")
+    engine = "xlsxwriter" if importlib.util.find_spec("xlsxwriter") else None
+    result_df.to_excel("排课结果_16周.xlsx", index=False, engine=engine)  # 核心修复点：去掉encoding="utf-8"
     print("✅ 排课结果已保存：排课结果_16周.xlsx")
 
     # 保存详细TXT（保留encoding，to_csv/to_txt支持）
-    with open("排课结果详情_16周.txt", "w", encoding="utf-8") as f:
-        f.write("======= 排课结果详情（16周） =======\n")
-        for item in result:
-            f.write(f"\n【{item['课程名称']}】（教师：{item['教师']}）\n")
-            f.write(f"涉及班级：{item['涉及班级']}\n")
-            f.write(f"场地：{item['场地类型']}\n")
-            f.write(f"总学时：{item['总学时']}（排课{item['排课时段数']}个时段）\n")
-            f.write(f"排课时段：{', '.join(item['排课时段'])}\n")
-            f.write("-" * 60 + "\n")
+    # 先把每门课拼成一段文本，最后一次性写入
+    separator = "-" * 60
+    lines = ["======= 排课结果详情（16周） =======\n"]
+    for item in result:
+        lines.append(
+            f"\n【{item['课程名称']}】（教师：{item['教师']}）\n"
+            f"涉及班级：{item['涉及班级']}\n"
+            f"场地：{item['场地类型']}\n"
+            f"总学时：{item['总学时']}（排课{item['排课时段数']}个时段）\n"
+            f"排课时段：{', '.join(item['排课时段'])}\n"
+            f"{separator}\n"
+        )
+    with open("排课结果详情_16周.txt", "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("".join(lines))
     print("✅ 排课详情已保存：排课结果详情_16周.txt")
 
 
 # ====================== 主函数 ======================
+def parse_args():
+    """命令行参数（默认值取自第一步的配置），方便批量对比不同求解器/约束组合而不用改代码"""
+    parser = argparse.ArgumentParser(description="16周排课")
+    parser.add_argument("--excel", default=EXCEL_PATH, help="课程情况Excel路径")
+    parser.add_argument("--backend", choices=["sparse", "poi", "pulp"], default=None,
+                        help=f"建模方式（默认{MODEL_BACKEND}；指定了--solver时默认pulp）")
+    parser.add_argument("--solver", choices=["auto", "gurobi", "highs", "cbc"], default=SOLVER_NAME,
+                        help="PuLP建模时使用的求解器（sparse/poi固定使用HiGHS）")
+    parser.add_argument("--time-limit", type=int, default=SOLVER_TIME_LIMIT, help="求解时间上限（秒）")
+    parser.add_argument("--enable-teacher", action=argparse.BooleanOptionalAction,
+                        default=ENABLE_TEACHER_CONSTRAINT, help="教师无冲突约束")
+    parser.add_argument("--enable-room", action=argparse.BooleanOptionalAction,
+                        default=ENABLE_ROOM_CONSTRAINT, help="场地无冲突约束")
+    parser.add_argument("--greedy", action=argparse.BooleanOptionalAction, default=GREEDY_PRESOLVE,
+                        help="先贪心预排，排满则直接输出（--no-greedy 关闭，始终求解MIP）")
+    parser.add_argument("--lazy", action=argparse.BooleanOptionalAction, default=LAZY_CONFLICT_CONSTRAINTS,
+                        help="PuLP建模时按需添加冲突约束（默认关闭）")
+    parser.add_argument("--weekly", action=argparse.BooleanOptionalAction, default=WEEKLY_AGGREGATE,
+                        help="先尝试按周聚合求解（默认关闭；聚合模型固定用PuLP求解，展开失败时仍求解完整模型）")
+    args = parser.parse_args()
+
+    # --solver只对PuLP建模生效：指定了求解器而没指定建模方式时改用PuLP，两者冲突时提示
+    if args.backend is None:
+        args.backend = "pulp" if args.solver != "auto" else MODEL_BACKEND
+    elif args.backend != "pulp" and args.solver != "auto":
+        print(f"⚠️ --solver {args.solver} 只在PuLP建模时生效，建模方式{args.backend}固定使用HiGHS，已忽略")
+    return args
+
+
+def pick_backend():
+    """按MODEL_BACKEND选择建模方式，依赖缺失时回退到PuLP，并打印实际使用的建模方式"""
+    if MODEL_BACKEND == "sparse" and milp is None:
+        print("⚠️ 建模方式sparse需要scipy>=1.9，未安装，改用PuLP建模")
+    elif MODEL_BACKEND == "poi" and (poi is None or not poi_highs.autoload_library()):
+        print("⚠️ 建模方式poi需要pyoptinterface和HiGHS库，未找到，改用PuLP建模")
+    elif MODEL_BACKEND in ("sparse", "poi"):
+        print(f"✅ 建模方式：{MODEL_BACKEND}")
+        return MODEL_BACKEND
+    else:
+        print("✅ 建模方式：pulp")
+    return "pulp"
+
+
 if __name__ == "__main__":
-    # 1. 查看列名
-    real_cols = check_excel_columns()
-    if not real_cols:
+    # 0. 命令行参数覆盖默认配置
+    args = parse_args()
+    EXCEL_PATH = args.excel
+    MODEL_BACKEND = args.backend
+    SOLVER_NAME = args.solver
+    SOLVER_TIME_LIMIT = args.time_limit
+    ENABLE_TEACHER_CONSTRAINT = args.enable_teacher
+    ENABLE_ROOM_CONSTRAINT = args.enable_room
+    WEEKLY_AGGREGATE = args.weekly
+    LAZY_CONFLICT_CONSTRAINTS = args.lazy
+    GREEDY_PRESOLVE = args.greedy
+
+    # 1. 查看列名（只读取一次Excel，后续直接复用）
+    course_df = check_excel_columns()
+    if course_df is None:
         exit()
 
-    # 2. 提示确认
-    input("\n📢 列名已匹配，按回车继续读取数据...")
+    # 2. 提示确认（非交互终端或设置了环境变量SCHED_BATCH时跳过，便于批量运行）
+    if sys.stdin.isatty() and not os.environ.get("SCHED_BATCH"):
+        input("\n📢 列名已匹配，按回车继续读取数据...")
 
     # 3. 数据预处理
     print("\n📌 正在读取并校验课程数据（16周）...")
     try:
-        courses = preprocess_data(real_cols)
+        courses = preprocess_data(course_df)
     except ValueError as e:
         print(f"❌ 数据预处理失败：{e}")
         exit()
 
-    # 4. 构建模型
+    # 4. 贪心预排（已满足全部约束时直接导出，不再建模求解）
+    initial = None
+    if GREEDY_PRESOLVE:
+        print("\n📌 正在贪心预排...")
+        initial, complete = greedy_schedule(courses)
+        if complete:
+            print("✅ 贪心预排已满足全部约束，跳过MIP求解")
+            export_results(courses, initial)
+            print("\n🎉 排课流程完成！")
+            exit()
+        print("⚠️ 贪心预排未能排满全部课程，交给求解器继续求解")
+
+    # 5. 可选：按周聚合求解（变量从 课程×480 降到 课程×16），展开失败再用完整模型
+    if WEEKLY_AGGREGATE:
+        print("\n📌 正在求解按周聚合的排课模型...")
+        schedule = solve_weekly_schedule(courses)
+        if schedule is not None:
+            export_results(courses, schedule)
+            print("\n🎉 排课流程完成！")
+            exit()
+        print("⚠️ 聚合求解未成功，改用完整模型求解")
+
+    # 6. 构建模型（所选建模方式的依赖未安装时回退到PuLP）
+    backend = pick_backend()
     print("\n📌 正在构建排课模型（16周）...")
-    prob, x = build_scheduling_model(courses)
+    if backend == "sparse":
+        model = build_sparse_model(courses)
+    elif backend == "poi":
+        model, X = build_poi_model(courses)
+    else:
+        prob, x, lazy_conflicts = build_scheduling_model(courses)
 
-    # 5. 求解
+    # 7. 求解
     print("\n📌 正在求解排课模型（16周数据，约5-10分钟）...")
-    solve_and_export(prob, x, courses)
+    if backend == "sparse":
+        solve_sparse_and_export(model, courses)
+    elif backend == "poi":
+        solve_poi_and_export(model, X, courses)
+    else:
+        solve_and_export(prob, x, courses, lazy_conflicts, initial)
 
     print("\n🎉 排课流程完成！")
\ No newline at end of file